@@ -20,6 +20,10 @@ _dst_option = click.option(
 )
 
 
+def _src_dst_options(f: Callable) -> Callable:
+    return _src_option(_dst_option(f))
+
+
 class AliasedGroup(click.Group):
     def __init__(self, *kargs, alias_map: Dict[str, str], **kwargs) -> None:
         super().__init__(*kargs, **kwargs)
@@ -51,312 +55,308 @@ def cli(
     transformer.load(dst=dst, path=input)
 
 
-def transformer_adaptor(func: Callable):
-    def decorator(f: Callable):
-        @click.pass_context
-        @wraps(func)
-        def wrapped(ctx: click.Context, *args, **kwargs):
-            transformer: Transformer = ctx.obj
-            func(transformer, *args, **kwargs)
+def transformer_adaptor(func: Callable) -> Callable:
+    @click.pass_context
+    @wraps(func)
+    def wrapped(ctx: click.Context, *args, **kwargs):
+        transformer: Transformer = ctx.obj
+        func(transformer, *args, **kwargs)
 
-        return wrapped
+    return wrapped
 
-    return decorator
 
+def transformer_command(
+    func: Callable, *decorators: Callable, **kwargs
+) -> click.Command:
+    """Register a command forwarding its parameters to a Transformer method.
 
-@cli.command()
-@click.argument("path", type=click.Path(exists=True))
-@_dst_option
-@transformer_adaptor(Transformer.load)
-def load():
-    pass
+    The decorators are applied as if they were stacked top to bottom above func.
+    """
+    command = transformer_adaptor(func)
+    for decorator in reversed(decorators):
+        command = decorator(command)
+    return cli.command(**kwargs)(command)
 
 
-@cli.command(name="filled")
-@_dst_option
-@click.option("--width", "-w", type=click.IntRange(min=1), default=1)
-@click.option("--height", "-h", type=click.IntRange(min=1), default=1)
-@click.option(
-    "--color",
-    "-c",
-    type=click.STRING,
-    default="FFFF",
-    help="Base color of the filled rect.",
+load = transformer_command(
+    Transformer.load,
+    click.argument("path", type=click.Path(exists=True)),
+    _dst_option,
 )
-@transformer_adaptor(Transformer.filled_rect)
-def filled():
-    pass
 
 
-@cli.command()
-@click.argument("path", type=click.Path())
-@_src_option
-@transformer_adaptor(Transformer.save)
-def save():
-    pass
+filled = transformer_command(
+    Transformer.filled_rect,
+    _dst_option,
+    click.option("--width", "-w", type=click.IntRange(min=1), default=1),
+    click.option("--height", "-h", type=click.IntRange(min=1), default=1),
+    click.option(
+        "--color",
+        "-c",
+        type=click.STRING,
+        default="FFFF",
+        help="Base color of the filled rect.",
+    ),
+    name="filled",
+)
 
 
-@cli.command()
-@_src_option
-@_dst_option
-@transformer_adaptor(Transformer.clone)
-def clone():
-    pass
+save = transformer_command(
+    Transformer.save,
+    click.argument("path", type=click.Path()),
+    _src_option,
+)
 
 
-@cli.command()
-@_src_option
-@_dst_option
-@click.option(
-    "--width",
-    "-w",
-    type=click.IntRange(min=-1),
-    default=-1,
-    help="Target width after resize.",
+clone = transformer_command(
+    Transformer.clone,
+    _src_dst_options,
 )
-@click.option(
-    "--height",
-    "-h",
-    type=click.IntRange(min=-1),
-    default=-1,
-    help="Target height after resize.",
-)
-@click.option(
-    "--algorithm",
-    "-a",
-    type=click.Choice(
-        ("auto", "linear", "nearest", "cubic", "area"), case_sensitive=False
+
+
+resize = transformer_command(
+    Transformer.resize,
+    _src_dst_options,
+    click.option(
+        "--width",
+        "-w",
+        type=click.IntRange(min=-1),
+        default=-1,
+        help="Target width after resize.",
+    ),
+    click.option(
+        "--height",
+        "-h",
+        type=click.IntRange(min=-1),
+        default=-1,
+        help="Target height after resize.",
+    ),
+    click.option(
+        "--algorithm",
+        "-a",
+        type=click.Choice(
+            ("auto", "linear", "nearest", "cubic", "area"), case_sensitive=False
+        ),
+        default="auto",
     ),
-    default="auto",
 )
-@transformer_adaptor(Transformer.resize)
-def resize():
-    pass
 
 
-@cli.command()
-@_src_option
-@_dst_option
-@click.option("--width", "-w", type=int, default=0)
-@click.option("--height", "-h", type=int, default=0)
-@click.option(
-    "--pivot-x",
-    "-px",
-    "px",
-    type=click.FloatRange(min=0, max=1, clamp=True),
-    default=0.5,
-)
-@click.option(
-    "--pivot-y",
-    "-py",
-    "py",
-    type=click.FloatRange(min=0, max=1, clamp=True),
-    default=0.5,
+pad = transformer_command(
+    Transformer.pad,
+    _src_dst_options,
+    click.option("--width", "-w", type=int, default=0),
+    click.option("--height", "-h", type=int, default=0),
+    click.option(
+        "--pivot-x",
+        "-px",
+        "px",
+        type=click.FloatRange(min=0, max=1, clamp=True),
+        default=0.5,
+    ),
+    click.option(
+        "--pivot-y",
+        "-py",
+        "py",
+        type=click.FloatRange(min=0, max=1, clamp=True),
+        default=0.5,
+    ),
+    click.option("--color", "-c", type=click.STRING, default="FFF0"),
 )
-@click.option("--color", "-c", type=click.STRING, default="FFF0")
-@transformer_adaptor(Transformer.pad)
-def pad():
-    pass
 
 
-@cli.command("alpha")
-@_src_option
-@_dst_option
-@click.option(
-    "--color", "-c", type=click.STRING, default="FFF", help="RGB for non-alpha channel."
+extract_alpha = transformer_command(
+    Transformer.extract_alpha,
+    _src_dst_options,
+    click.option(
+        "--color",
+        "-c",
+        type=click.STRING,
+        default="FFF",
+        help="RGB for non-alpha channel.",
+    ),
+    name="alpha",
 )
-@transformer_adaptor(Transformer.extract_alpha)
-def extract_alpha():
-    pass
 
 
-@cli.command()
-@_src_option
-@_dst_option
-@click.option(
-    "--radius", "-r", type=click.IntRange(min=1), default=1, help="Radius for dilation"
+dilate = transformer_command(
+    Transformer.dilate,
+    _src_dst_options,
+    click.option(
+        "--radius",
+        "-r",
+        type=click.IntRange(min=1),
+        default=1,
+        help="Radius for dilation",
+    ),
 )
-@transformer_adaptor(Transformer.dilate)
-def dilate():
-    pass
 
 
-@cli.command()
-@_src_option
-@_dst_option
-@click.option(
-    "--radius", "-r", type=click.IntRange(min=1), default=1, help="Radius for erosion"
+erode = transformer_command(
+    Transformer.erode,
+    _src_dst_options,
+    click.option(
+        "--radius",
+        "-r",
+        type=click.IntRange(min=1),
+        default=1,
+        help="Radius for erosion",
+    ),
 )
-@transformer_adaptor(Transformer.erode)
-def erode():
-    pass
 
 
-@cli.command()
-@_src_option
-@_dst_option
-@click.option(
-    "--radius",
-    "-r",
-    type=click.IntRange(min=1),
-    default=1,
-    help="Radius for Gaussian blur",
+blur = transformer_command(
+    Transformer.blur,
+    _src_dst_options,
+    click.option(
+        "--radius",
+        "-r",
+        type=click.IntRange(min=1),
+        default=1,
+        help="Radius for Gaussian blur",
+    ),
 )
-@transformer_adaptor(Transformer.blur)
-def blur():
-    pass
 
 
-@cli.command(name="rounded")
-@_src_option
-@_dst_option
-@click.option(
-    "--top-left",
-    "-tl",
-    "tl",
-    type=click.FloatRange(min=0),
-    default=1,
-    help="Top Left Radius",
-)
-@click.option(
-    "--top-right",
-    "-tr",
-    "tr",
-    type=click.FloatRange(min=0),
-    default=1,
-    help="Top Right Radius",
-)
-@click.option(
-    "--bottom-left",
-    "-bl",
-    "bl",
-    type=click.FloatRange(min=0),
-    default=1,
-    help="Bottom Left Radius",
-)
-@click.option(
-    "--bottom-right",
-    "-br",
-    "br",
-    type=click.FloatRange(min=0),
-    default=1,
-    help="Bottom Right Radius",
-)
-@click.option(
-    "--base-radius",
-    "-b",
-    "base",
-    type=click.FloatRange(min=0),
-    default=1,
-    help="The base radius, so that we can tune all 4 radius together.",
-)
-@click.option(
-    "--stroke",
-    "-s",
-    "stroke",
-    type=click.FloatRange(min=0, min_open=True),
-    default=None,
-    help="Stroke Border Width",
-)
-@click.option(
-    "--weight",
-    "-w",
-    "weight",
-    type=click.FloatRange(min=0),
-    default=1,
-    help="The relative weight between Width / Height if scale mode is relative.",
-)
-@click.option(
-    "--scale-mode",
-    "-m",
-    "scale_mode",
-    default="const",
-    type=click.Choice(("const", "rel"), case_sensitive=False),
-)
-@click.option(
-    "--falloff",
-    "-f",
-    "falloff",
-    type=click.FloatRange(min=0),
-    default=0,
-    help="The falloff fade-out.",
+apply_rounded_corners = transformer_command(
+    Transformer.apply_rounded_corners,
+    _src_dst_options,
+    click.option(
+        "--top-left",
+        "-tl",
+        "tl",
+        type=click.FloatRange(min=0),
+        default=1,
+        help="Top Left Radius",
+    ),
+    click.option(
+        "--top-right",
+        "-tr",
+        "tr",
+        type=click.FloatRange(min=0),
+        default=1,
+        help="Top Right Radius",
+    ),
+    click.option(
+        "--bottom-left",
+        "-bl",
+        "bl",
+        type=click.FloatRange(min=0),
+        default=1,
+        help="Bottom Left Radius",
+    ),
+    click.option(
+        "--bottom-right",
+        "-br",
+        "br",
+        type=click.FloatRange(min=0),
+        default=1,
+        help="Bottom Right Radius",
+    ),
+    click.option(
+        "--base-radius",
+        "-b",
+        "base",
+        type=click.FloatRange(min=0),
+        default=1,
+        help="The base radius, so that we can tune all 4 radius together.",
+    ),
+    click.option(
+        "--stroke",
+        "-s",
+        "stroke",
+        type=click.FloatRange(min=0, min_open=True),
+        default=None,
+        help="Stroke Border Width",
+    ),
+    click.option(
+        "--weight",
+        "-w",
+        "weight",
+        type=click.FloatRange(min=0),
+        default=1,
+        help="The relative weight between Width / Height if scale mode is relative.",
+    ),
+    click.option(
+        "--scale-mode",
+        "-m",
+        "scale_mode",
+        default="const",
+        type=click.Choice(("const", "rel"), case_sensitive=False),
+    ),
+    click.option(
+        "--falloff",
+        "-f",
+        "falloff",
+        type=click.FloatRange(min=0),
+        default=0,
+        help="The falloff fade-out.",
+    ),
+    name="rounded",
 )
-@transformer_adaptor(Transformer.apply_rounded_corners)
-def apply_rounded_corners():
-    pass
 
 
-@cli.command()
-@_src_option
-@_dst_option
-@click.option("--color", "-c", type=click.STRING, default="FFFF", help="Tint color")
-@transformer_adaptor(Transformer.tint)
-def tint():
-    pass
+tint = transformer_command(
+    Transformer.tint,
+    _src_dst_options,
+    click.option("--color", "-c", type=click.STRING, default="FFFF", help="Tint color"),
+)
 
 
-@cli.command()
-@_src_option
-@_dst_option
-@click.option(
-    "--by", "-b", type=click.STRING, default=None, help="The Subtrahend data."
-)
-@click.option(
-    "--channel",
-    "-c",
-    type=click.IntRange(min=0, max=3),
-    default=3,
-    help="The channel subtraction happens.",
+subtract = transformer_command(
+    Transformer.subtract,
+    _src_dst_options,
+    click.option(
+        "--by", "-b", type=click.STRING, default=None, help="The Subtrahend data."
+    ),
+    click.option(
+        "--channel",
+        "-c",
+        type=click.IntRange(min=0, max=3),
+        default=3,
+        help="The channel subtraction happens.",
+    ),
 )
-@transformer_adaptor(Transformer.subtract)
-def subtract():
-    pass
 
 
-@cli.command()
-@_src_option
-@_dst_option
-@click.option(
-    "--by", "-b", type=click.STRING, default=None, help="The multiplying matrix."
+multiply = transformer_command(
+    Transformer.multiply,
+    _src_dst_options,
+    click.option(
+        "--by", "-b", type=click.STRING, default=None, help="The multiplying matrix."
+    ),
 )
-@transformer_adaptor(Transformer.multiply)
-def multiply():
-    pass
 
 
-@cli.command()
-@_src_option
-@_dst_option
-@click.option(
-    "--horizontal", "-h", is_flag=True, default=False, help="Flip horizontally."
+flip = transformer_command(
+    Transformer.flip,
+    _src_dst_options,
+    click.option(
+        "--horizontal", "-h", is_flag=True, default=False, help="Flip horizontally."
+    ),
+    click.option(
+        "--vertical", "-v", is_flag=True, default=False, help="Flip vertically."
+    ),
 )
-@click.option("--vertical", "-v", is_flag=True, default=False, help="Flip vertically.")
-@transformer_adaptor(Transformer.flip)
-def flip():
-    pass
 
 
 @cli.command()
-@_src_option
-@_dst_option
+@_src_dst_options
 @click.pass_context
 def vflip(ctx: click.Context, src: Optional[str] = None, dst: Optional[str] = None):
     ctx.invoke(flip, src=src, dst=dst, horizontal=False, vertical=True)
 
 
 @cli.command()
-@_src_option
-@_dst_option
+@_src_dst_options
 @click.pass_context
 def hflip(ctx: click.Context, src: Optional[str] = None, dst: Optional[str] = None):
     ctx.invoke(flip, src=src, dst=dst, horizontal=True, vertical=False)
 
 
-@cli.command()
-@_src_option
-@_dst_option
-@click.option("--left", "-l", count=True)
-@click.option("--right", "-r", count=True)
-@transformer_adaptor(Transformer.rotate)
-def rotate():
-    pass
+rotate = transformer_command(
+    Transformer.rotate,
+    _src_dst_options,
+    click.option("--left", "-l", count=True),
+    click.option("--right", "-r", count=True),
+)
@@ -2,15 +2,25 @@ import click
 import os.path
 from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 import requests
-from tqdm import tqdm
 
-from .utils import get_bitrise_api_key, get_bitrise_org_slug
+from .utils import (
+    download_file,
+    get_bitrise_api_key,
+    get_bitrise_org_slug,
+    get_session,
+)
 
 
 class Client:
-    def __init__(self, api_key: Optional[str] = None, org_slug: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        org_slug: Optional[str] = None,
+        session: Optional[requests.Session] = None,
+    ):
         self._api_key = api_key if api_key is not None else get_bitrise_api_key()
         self._org_slug = org_slug if org_slug is not None else get_bitrise_org_slug()
+        self._session = session if session is not None else get_session()
 
     @classmethod
     def _get_api_endpoint(cls, path: str) -> str:
@@ -44,7 +54,7 @@ class Client:
         return headers
 
     def get_apps(self) -> List[Dict]:
-        response = requests.request(
+        response = self._session.request(
             url=self._get_api_endpoint(f"apps"),
             method="GET",
             headers=self._get_request_headers(),
@@ -54,7 +64,7 @@ class Client:
         json = response.json()
         all_apps = [app for app in json["data"]]
         while "next" in json["paging"]:
-            response = requests.request(
+            response = self._session.request(
                 url=self._get_api_endpoint(f"apps"),
                 method="GET",
                 headers=self._get_request_headers(),
@@ -78,7 +88,7 @@ class Client:
                     "is_expand": False,
                 }
             ]
-        response = requests.request(
+        response = self._session.request(
             url=self._get_app_endpoint(app_slug, "builds"),
             method="POST",
             headers=self._get_request_headers(),
@@ -90,7 +100,7 @@ class Client:
         return (response.status_code, response.reason, response.json())
 
     def _get_post_builds(self, app_slug: str) -> Iterator[Dict]:
-        response = requests.request(
+        response = self._session.request(
             url=self._get_app_endpoint(app_slug, "builds"),
             method="GET",
             headers=self._get_request_headers(),
@@ -101,7 +111,7 @@ class Client:
         for data in json["data"]:
             yield data
         while "next" in json["paging"]:
-            response = requests.request(
+            response = self._session.request(
                 url=self._get_app_endpoint(app_slug, "builds"),
                 method="GET",
                 headers=self._get_request_headers(),
@@ -113,7 +123,7 @@ class Client:
                 yield data
 
     def _fetch_artifacts(self, app_slug: str, build_slug: str) -> Tuple[Dict, Dict]:
-        response = requests.request(
+        response = self._session.request(
             url=self._get_builds_endpoint(app_slug, build_slug, "artifacts"),
             method="GET",
             headers=self._get_request_headers(),
@@ -132,7 +142,7 @@ class Client:
     def _get_download_url(
         self, app_slug: str, build_slug: str, artifact_slug: str
     ) -> str:
-        response = requests.request(
+        response = self._session.request(
             url=self._get_artifact_endpoint(app_slug, build_slug, artifact_slug),
             method="GET",
             headers=self._get_request_headers(),
@@ -146,7 +156,7 @@ class Client:
         download_url = self._get_download_url(
             app_slug, build_slug, env_artifact["slug"]
         )
-        downloaded = requests.request(url=download_url, method="GET")
+        downloaded = self._session.request(url=download_url, method="GET")
         downloaded.raise_for_status()
         return downloaded.json()
 
@@ -184,7 +194,7 @@ class Client:
     def download_artifact(
         self, app_slug: str, build_slug: str, artifact_slug: str, out_dir: str
     ) -> None:
-        response = requests.request(
+        response = self._session.request(
             url=self._get_artifact_endpoint(app_slug, build_slug, artifact_slug),
             method="GET",
             headers=self._get_request_headers(),
@@ -197,14 +207,7 @@ class Client:
         output_file = os.path.join(out_dir, metadata["title"])
         click.echo(f"Downloading to {output_file}")
         click.echo(f"Download URL: {download_url}")
-        with requests.get(download_url, stream=True) as req:
-            req.raise_for_status()
-            with open(output_file, "wb") as file:
-                with tqdm(total=file_size_bytes, unit="b", unit_scale=True) as pbar:
-                    for chunk in req.iter_content(chunk_size=8192):
-                        if chunk:
-                            file.write(chunk)
-                            pbar.update(len(chunk))
+        download_file(download_url, output_file, file_size_bytes, session=self._session)
 
     def download_apk(
         self, app_slug: str, build: Dict, apk_artifact: Dict, out_dir: str
@@ -216,11 +219,4 @@ class Client:
         output_file = os.path.join(out_dir, apk_artifact["title"])
         click.echo(f"Downloading to {output_file}")
         click.echo(f"Download URL: {download_url}")
-        with requests.get(download_url, stream=True) as req:
-            req.raise_for_status()
-            with open(output_file, "wb") as file:
-                with tqdm(total=file_size_bytes, unit="b", unit_scale=True) as pbar:
-                    for chunk in req.iter_content(chunk_size=8192):
-                        if chunk:
-                            file.write(chunk)
-                            pbar.update(len(chunk))
+        download_file(download_url, output_file, file_size_bytes, session=self._session)
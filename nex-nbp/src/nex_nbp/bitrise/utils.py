@@ -1,6 +1,17 @@
+import contextlib
 from functools import cache
 from importlib import resources
+import os
+import shutil
+from typing import Optional
+
 from nex_kms import decrypt_string
+import requests
+from requests.adapters import HTTPAdapter
+from tqdm import tqdm
+from urllib3.util.retry import Retry
+
+_DOWNLOAD_CHUNK_SIZE = 1024 * 1024
 
 
 @cache
@@ -11,3 +22,72 @@ def get_bitrise_api_key():
 @cache
 def get_bitrise_org_slug():
     return decrypt_string(resources.files() / "secrets/bitrise_org_slug.enc")
+
+
+def _new_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=8,
+        pool_maxsize=16,
+        max_retries=Retry(total=3, backoff_factor=0.3),
+    )
+    session.mount("https://", adapter)
+    return session
+
+
+@cache
+def get_session() -> requests.Session:
+    """Shared session so that sequential Bitrise requests reuse connections."""
+    return _new_session()
+
+
+def _preallocate(file, byte_size: Optional[int]) -> None:
+    if not byte_size or not hasattr(os, "posix_fallocate"):
+        return
+    try:
+        os.posix_fallocate(file.fileno(), 0, byte_size)
+    except OSError:
+        # Not every filesystem supports it, and it is only an optimization.
+        pass
+
+
+def download_file(
+    url: str,
+    output_file: str,
+    byte_size: Optional[int],
+    position: Optional[int] = None,
+    session: Optional[requests.Session] = None,
+) -> None:
+    # Sessions are not thread-safe, so without one given the download gets its own.
+    if session is None:
+        with _new_session() as own_session:
+            download_file(url, output_file, byte_size, position, own_session)
+        return
+    with session.get(url, stream=True) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        try:
+            with open(output_file, "wb") as file:
+                _preallocate(file, byte_size)
+                with tqdm.wrapattr(
+                    file,
+                    "write",
+                    total=byte_size,
+                    desc=os.path.basename(output_file),
+                    position=position,
+                    # Positioned bars share rows with later downloads, so clear them.
+                    leave=position is None,
+                    unit="b",
+                    unit_scale=True,
+                ) as wrapped:
+                    shutil.copyfileobj(
+                        response.raw, wrapped, length=_DOWNLOAD_CHUNK_SIZE
+                    )
+                # Drop any preallocated tail if the download was shorter than expected.
+                file.truncate()
+        except BaseException:
+            # The file may be preallocated to full size; never leave one behind
+            # that looks complete.
+            with contextlib.suppress(OSError):
+                os.unlink(output_file)
+            raise
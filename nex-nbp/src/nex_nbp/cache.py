@@ -0,0 +1,59 @@
+import dataclasses
+import json
+import os
+import tempfile
+import time
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from nexcli.common.constants import persistance_dir
+
+if TYPE_CHECKING:
+    from nex_bitrise_index import Client as BitriseIndexClient
+    from nex_bitrise_index.interface import AppEntry
+
+_APPS_CACHE_PATH = persistance_dir / "caches" / "nbp_apps.json"
+_APPS_CACHE_TTL_SECONDS = 15 * 60
+
+
+def _load_cached_apps() -> Optional[List["AppEntry"]]:
+    from nex_bitrise_index.interface import AppEntry
+
+    try:
+        age = time.time() - os.path.getmtime(_APPS_CACHE_PATH)
+        if age >= _APPS_CACHE_TTL_SECONDS:
+            return None
+        return [AppEntry(**app) for app in json.loads(_APPS_CACHE_PATH.read_text())]
+    except (OSError, TypeError, ValueError):
+        # Missing or unreadable cache, treat it as a miss.
+        return None
+
+
+def _store_cached_apps(apps: List["AppEntry"]) -> None:
+    try:
+        os.makedirs(_APPS_CACHE_PATH.parent, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=_APPS_CACHE_PATH.parent, suffix=".tmp")
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, "w") as file:
+            json.dump([dataclasses.asdict(app) for app in apps], file)
+        # Atomic so that concurrent invocations never read a partial file.
+        os.replace(tmp_path, _APPS_CACHE_PATH)
+    except (OSError, TypeError):
+        os.unlink(tmp_path)
+
+
+def fetch_all_apps(
+    bitrise_index_client: "BitriseIndexClient", refresh: bool = False
+) -> Tuple[List["AppEntry"], bool]:
+    """Fetch all apps, reusing a recent on-disk copy unless refresh is set.
+
+    Also returns whether the apps came from the on-disk copy.
+    """
+    if not refresh:
+        apps = _load_cached_apps()
+        if apps is not None:
+            return apps, True
+    apps = list(bitrise_index_client.fetch_all_apps())
+    _store_cached_apps(apps)
+    return apps, False
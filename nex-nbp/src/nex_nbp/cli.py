@@ -1,34 +1,90 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import os.path
+import queue
 from functools import cached_property
-from typing import Dict, List, Optional, Sequence
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Final,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
 import click
-from tabulate import tabulate
-from nex_bitrise_index import Client as BitriseIndexClient
-from nex_bitrise_index.interface import AppEntry, BuildEntry
-import requests
-from tqdm import tqdm
 
-from .bitrise import BitriseClient
-from .git import GitInfo
+from .cache import fetch_all_apps
+
+# The index client pulls in firestore, the bitrise helpers pull in requests and
+# tqdm, and git info pulls in GitPython. They are imported where they are needed
+# to keep startup fast.
+if TYPE_CHECKING:
+    from .git import GitInfo
+    from nex_bitrise_index import Client as BitriseIndexClient
+    from nex_bitrise_index.interface import AppEntry, BuildEntry
+
+
+_WORKFLOW_MAP: Final[Mapping[Tuple[str, str], str]] = {
+    ("olympia", "stag"): "build_olympia_apk_staging",
+    ("olympia", "prod"): "build_olympia_apk_production",
+    ("sk", "stag"): "build_sk_apk_staging",
+    ("sk", "prod"): "build_sk_apk_production",
+    ("sky", "stag"): "build_android_apk_sky_beta_staging",
+    ("sky", "prod"): "build_android_apk_sky_beta",
+    ("retail", "stag"): "build_olympia_retail_demo_stag",
+    ("retail", "prod"): "build_olympia_retail_demo_prod",
+}
 
 
 class NBPCommandContext:
+    # __dict__ is kept for the cached properties.
+    __slots__ = (
+        "_app_name",
+        "_refresh_apps",
+        "branch",
+        "workflows",
+        "_build_filters",
+        "__dict__",
+    )
+
     def __init__(self):
-        self.git_info = GitInfo.create()
-        self.bitrise_index_client = BitriseIndexClient()
         self._app_name: Optional[str] = None
-        self._branch: Optional[str] = None
-        self._workflows: List[str] = []
+        self._refresh_apps = False
+        self.branch: Optional[str] = None
+        self.workflows: List[str] = []
+        self._build_filters: Optional[Tuple] = None
+
+    @cached_property
+    def git_info(self) -> Optional["GitInfo"]:
+        from .git import GitInfo
+
+        return GitInfo.create()
+
+    @cached_property
+    def bitrise_index_client(self) -> "BitriseIndexClient":
+        from nex_bitrise_index import Client as BitriseIndexClient
+
+        return BitriseIndexClient()
 
     def set_app_name(self, app_name: Optional[str]) -> None:
         self._app_name = app_name
 
+    def set_refresh_apps(self, refresh_apps: bool) -> None:
+        self._refresh_apps = refresh_apps
+
+    def fetch_all_apps(self) -> List["AppEntry"]:
+        apps, _ = fetch_all_apps(self.bitrise_index_client, self._refresh_apps)
+        return apps
+
     @classmethod
     def _find_app_entry_by_git(
-        cls, apps: List[AppEntry], git_info: GitInfo
-    ) -> Optional[AppEntry]:
+        cls, apps: List["AppEntry"], git_info: "GitInfo"
+    ) -> Optional["AppEntry"]:
         remote_url = git_info.remote_url
         for app in apps:
             if app.repo_url == remote_url:
@@ -36,27 +92,36 @@ class NBPCommandContext:
         return None
 
     @classmethod
-    def _find_app_entry_by_app_name(
-        cls, apps: List[AppEntry], app_name: str
-    ) -> Optional[AppEntry]:
+    def _find_app_entry_by_app_code(
+        cls, apps: List["AppEntry"], app_name: str
+    ) -> Optional["AppEntry"]:
         app_name = app_name.lower()
         for app in apps:
             if app.app_code.lower() == app_name:
                 return app
+        return None
+
+    @classmethod
+    def _find_app_entry_by_app_name(
+        cls, apps: List["AppEntry"], app_name: str
+    ) -> Optional["AppEntry"]:
+        app_name = app_name.lower()
+        # Normalize the titles once instead of on every matching pass.
+        titles = [(app, app.title.lower()) for app in apps]
+        titles_no_space = [(app, title.replace(" ", "")) for app, title in titles]
 
         # We pick the app name that is most suitable.
-        for app in apps:
+        for app, title in titles:
             # Try to find a match.
-            if app.title.lower().find(app_name) != -1:
+            if app_name in title:
                 return app
         # No match, try removing spaces.
         app_name = app_name.replace(" ", "")
-        for app in apps:
-            if app.title.lower().replace(" ", "").find(app_name) != -1:
+        for app, title in titles_no_space:
+            if app_name in title:
                 return app
         # Still no match. Try to find one that has the same sequence.
-        for app in apps:
-            title = app.title.lower().replace(" ", "")
+        for app, title in titles_no_space:
             pos = -1
             for ch in app_name:
                 pos = title.find(ch, pos + 1)
@@ -68,50 +133,62 @@ class NBPCommandContext:
         return None
 
     @classmethod
-    def _find_app_entry(
-        cls, apps: List[AppEntry], git_info: Optional[GitInfo], app_name: Optional[str]
-    ) -> Optional[AppEntry]:
+    def _match_app_entry_exactly(
+        cls,
+        apps: List["AppEntry"],
+        git_info: Optional["GitInfo"],
+        app_name: Optional[str],
+    ) -> Optional["AppEntry"]:
         if app_name is not None:
-            app_entry = cls._find_app_entry_by_app_name(apps, app_name)
-            if app_entry is None:
+            return cls._find_app_entry_by_app_code(apps, app_name)
+        return cls._find_app_entry_by_git(apps, git_info)
+
+    def _find_app_entry(
+        self, git_info: Optional["GitInfo"], app_name: Optional[str]
+    ) -> "AppEntry":
+        if app_name is None and git_info is None:
+            raise click.UsageError(
+                "Please run inside a git repository to use auto app discovery."
+            )
+        apps, cached = fetch_all_apps(self.bitrise_index_client, self._refresh_apps)
+        app_entry = self._match_app_entry_exactly(apps, git_info, app_name)
+        if app_entry is None and cached:
+            # The cached app list may predate a newly registered app. Check for
+            # an exact match on fresh data before falling back to fuzzy matching.
+            apps, _ = fetch_all_apps(self.bitrise_index_client, refresh=True)
+            app_entry = self._match_app_entry_exactly(apps, git_info, app_name)
+        if app_entry is None and app_name is not None:
+            app_entry = self._find_app_entry_by_app_name(apps, app_name)
+        if app_entry is None:
+            if app_name is not None:
                 raise click.UsageError(
                     f"Could not find app on bitrise matching {app_name}"
                 )
-        else:
-            if git_info is None:
-                raise click.UsageError(
-                    "Please run inside a git repository to use auto app discovery."
-                )
-            app_entry = cls._find_app_entry_by_git(apps, git_info)
-            if app_entry is None:
-                raise click.UsageError(
-                    f"Could not find app on bitrise matching git url {git_info.remote_url}"
-                )
+            raise click.UsageError(
+                f"Could not find app on bitrise matching git url {git_info.remote_url}"
+            )
         click.echo(f"Selected App: {app_entry.app_code}")
         return app_entry
 
     @cached_property
-    def app_entry(self) -> AppEntry:
-        all_apps = self.bitrise_index_client.fetch_all_apps()
-        return self._find_app_entry(all_apps, self.git_info, self._app_name)
+    def app_entry(self) -> "AppEntry":
+        # Only look into the git repo when the app is not named explicitly.
+        git_info = self.git_info if self._app_name is None else None
+        return self._find_app_entry(git_info, self._app_name)
 
     def initialize_branch(
         self, branch: Optional[str], use_git_branch: bool = True
     ) -> None:
         if branch:
-            self._branch = branch
+            self.branch = branch
         elif use_git_branch:
             if self.git_info is None:
                 raise click.UsageError(
                     "Auto git branch is only valid inside a git repo."
                 )
-            self._branch = self.git_info.remote_name
+            self.branch = self.git_info.remote_name
         else:
-            self._branch = None
-
-    @cached_property
-    def branch(self) -> Optional[str]:
-        return self._branch
+            self.branch = None
 
     @classmethod
     def _compute_suffixes(
@@ -132,16 +209,21 @@ class NBPCommandContext:
             raise click.UsageError("No staging nor production, bailing out.")
         return suffixes
 
-    _WORKFLOW_MAP = {
-        "olympia#-#stag": "build_olympia_apk_staging",
-        "olympia#-#prod": "build_olympia_apk_production",
-        "sk#-#stag": "build_sk_apk_staging",
-        "sk#-#prod": "build_sk_apk_production",
-        "sky#-#stag": "build_android_apk_sky_beta_staging",
-        "sky#-#prod": "build_android_apk_sky_beta",
-        "retail#-#stag": "build_olympia_retail_demo_stag",
-        "retail#-#prod": "build_olympia_retail_demo_prod",
-    }
+    def set_build_filters(
+        self,
+        branch: Optional[str],
+        use_git_branch: bool,
+        targets: Sequence[str],
+        staging: Optional[bool],
+        production: Optional[bool],
+    ) -> None:
+        self._build_filters = (branch, use_git_branch, targets, staging, production)
+
+    def initialize_build_filters(self) -> None:
+        """Resolve the branch / workflows from the stored build filters."""
+        branch, use_git_branch, targets, staging, production = self._build_filters
+        self.initialize_branch(branch, use_git_branch)
+        self.initialize_workflows(targets, staging, production)
 
     def initialize_workflows(
         self,
@@ -150,31 +232,35 @@ class NBPCommandContext:
         production: Optional[bool],
     ) -> None:
         suffixes = self._compute_suffixes(staging, production)
-        workflows = self._workflows
+        workflows = self.workflows
         for target in targets:
             for suffix in suffixes:
-                key = f"{target}#-#{suffix}"
-                if key not in self._WORKFLOW_MAP:
+                workflow = _WORKFLOW_MAP.get((target, suffix))
+                if workflow is None:
                     click.echo(
                         f"Cannot identify workflow id for {target} {suffix}", err=True
                     )
                     continue
-                workflows.append(self._WORKFLOW_MAP[key])
-
-    @cached_property
-    def workflows(self) -> List[str]:
-        return self._workflows
+                workflows.append(workflow)
 
 
 @click.group()
 @click.option(
     "-a", "--app-name", "app_name", help="App name", type=click.STRING, default=None
 )
+@click.option(
+    "--refresh-apps",
+    "refresh_apps",
+    is_flag=True,
+    help="Ignore the cached app list and fetch it again.",
+    default=False,
+)
 @click.pass_context
-def nbp(ctx: click.Context, app_name: Optional[str]) -> None:
+def nbp(ctx: click.Context, app_name: Optional[str], refresh_apps: bool) -> None:
     """Provide utilities of interacting with NBP projects."""
     ctx.ensure_object(NBPCommandContext)
     ctx.obj.set_app_name(app_name)
+    ctx.obj.set_refresh_apps(refresh_apps)
 
 
 _staging_option = click.option(
@@ -203,13 +289,15 @@ _targets_option = click.option(
 )
 
 
+def _workflow_options(f: Callable) -> Callable:
+    return _staging_option(_production_option(_targets_option(f)))
+
+
 @nbp.command()
 @click.option(
     "-b", "--branch", "branch", help="Git Branch", type=click.STRING, default=None
 )
-@_staging_option
-@_production_option
-@_targets_option
+@_workflow_options
 @click.option("-c", "--clean/--no-clean", "clean", is_flag=True, default=False)
 @click.pass_context
 def trigger(
@@ -221,6 +309,8 @@ def trigger(
     clean: bool,
 ) -> None:
     """Trigger a build through bitrise."""
+    from .bitrise import BitriseClient
+
     context: NBPCommandContext = ctx.obj
     app_entry = context.app_entry
     context.initialize_branch(branch)
@@ -241,16 +331,47 @@ def trigger(
             click.echo(f"    {response['build_url']}")
 
 
+_pretty_option = click.option(
+    "--pretty",
+    "pretty",
+    is_flag=True,
+    help="Lay out the table with tabulate.",
+    default=False,
+)
+
+
+def _format_table(
+    table: Sequence[Sequence], headers: Sequence[str], pretty: bool
+) -> str:
+    if pretty:
+        from tabulate import tabulate
+
+        return tabulate(table, headers, tablefmt="simple")
+
+    rows = [["" if cell is None else str(cell) for cell in row] for row in table]
+    widths = [
+        max([len(header)] + [len(row[col]) for row in rows])
+        for col, header in enumerate(headers)
+    ]
+    template = "  ".join(f"{{:<{width}}}" for width in widths)
+    lines = [
+        template.format(*headers),
+        template.format(*("-" * width for width in widths)),
+    ]
+    lines.extend(template.format(*row) for row in rows)
+    return "\n".join(line.rstrip() for line in lines)
+
+
 @nbp.command("list")
+@_pretty_option
 @click.pass_context
-def list_projects(ctx: click.Context) -> None:
+def list_projects(ctx: click.Context, pretty: bool) -> None:
     """List configured NBP projects."""
     context: NBPCommandContext = ctx.obj
-    bitrise_index_client = context.bitrise_index_client
-    all_apps = bitrise_index_client.fetch_all_apps()
-    table = sorted([app.title, app.repo_url] for app in all_apps)
+    all_apps = context.fetch_all_apps()
+    table = sorted([(app.title, app.repo_url) for app in all_apps])
     headers = ["TITLE", "REPO-URL"]
-    click.echo(tabulate(table, headers, tablefmt="simple"))
+    click.echo(_format_table(table, headers, pretty))
 
 
 @nbp.group("builds")
@@ -270,9 +391,7 @@ def list_projects(ctx: click.Context) -> None:
     help="Use branch from current git repo.",
     default=False,
 )
-@_staging_option
-@_production_option
-@_targets_option
+@_workflow_options
 @click.pass_context
 def builds(
     ctx: click.Context,
@@ -283,9 +402,32 @@ def builds(
     targets: Sequence[str],
 ) -> None:
     """Handle build."""
+    # Only the subcommands that filter builds resolve these.
     context: NBPCommandContext = ctx.obj
-    context.initialize_branch(branch, use_git_branch)
-    context.initialize_workflows(targets, staging, production)
+    context.set_build_filters(branch, use_git_branch, targets, staging, production)
+
+
+def _list_latest_builds(
+    bitrise_index_client: "BitriseIndexClient",
+    app_code: str,
+    branch: Optional[str],
+    workflows: Sequence[str],
+    limit: int,
+) -> List[List["BuildEntry"]]:
+    """Fetch the latest builds of each workflow, in the order of workflows."""
+    if not workflows:
+        return []
+    with ThreadPoolExecutor(max_workers=len(workflows)) as executor:
+        return list(
+            executor.map(
+                lambda workflow: list(
+                    bitrise_index_client.list_latest_builds(
+                        app_code, branch=branch, workflow=workflow, limit=limit
+                    )
+                ),
+                workflows,
+            )
+        )
 
 
 @builds.command("list")
@@ -296,35 +438,35 @@ def builds(
     help="Limits of entries per workflow.",
     default=3,
 )
+@_pretty_option
 @click.pass_context
-def builds_list(ctx: click.Context, limit: int) -> None:
+def builds_list(ctx: click.Context, limit: int, pretty: bool) -> None:
     """Lists recent completed builds for the given app / branch."""
     context: NBPCommandContext = ctx.obj
+    context.initialize_build_filters()
 
     app_entry = context.app_entry
     bitrise_index_client = context.bitrise_index_client
     git_branch = context.branch
 
+    workflows = context.workflows
     headers = ("Build#", "Branch", "Time", "Post Build URL", "APK Download URL")
-    for workflow in context.workflows:
-        click.echo(f"Workflow {workflow}:")
-        click.echo(
-            tabulate(
-                (
-                    (
-                        build_entry.build_num,
-                        build_entry.branch,
-                        datetime.fromtimestamp(build_entry.timestamp),
-                        build_entry.post_build_url,
-                        build_entry.apk_download_url,
-                    )
-                    for build_entry in bitrise_index_client.list_latest_builds(
-                        app_entry.app_code, git_branch, workflow, limit
-                    )
-                ),
-                headers=headers,
+    all_build_entries = _list_latest_builds(
+        bitrise_index_client, app_entry.app_code, git_branch, workflows, limit
+    )
+    for workflow, build_entries in zip(workflows, all_build_entries):
+        table = [
+            (
+                build_entry.build_num,
+                build_entry.branch,
+                datetime.fromtimestamp(build_entry.timestamp),
+                build_entry.post_build_url,
+                build_entry.apk_download_url,
             )
-        )
+            for build_entry in build_entries
+        ]
+        click.echo(f"Workflow {workflow}:")
+        click.echo(_format_table(table, headers, pretty))
 
 
 @builds.command("details")
@@ -337,19 +479,27 @@ def build_details(ctx: click.Context, build_nums: Sequence[int]) -> None:
     bitrise_index_client = context.bitrise_index_client
     entries = bitrise_index_client.fetch_builds(app_entry.app_code, build_nums)
     for entry in entries:
-        print("==================================")
-        print(f"BuildNum:  {entry.build_num}")
-        print(f"Version:   {entry.app_build_num}")
-        print(f"Time:      {datetime.fromtimestamp(entry.timestamp)}")
-        print(f"Workflow:  {entry.workflow}")
-        print(f"Branch:    {entry.branch}")
-        print(f"PostBuild: {entry.post_build_url}")
-        print(f"APK:       {entry.apk_download_url}")
-        print(f"Tags:      {entry.tags}")
+        # Emit each entry with a single write rather than one per line.
+        lines = [
+            "==================================",
+            f"BuildNum:  {entry.build_num}",
+            f"Version:   {entry.app_build_num}",
+            f"Time:      {datetime.fromtimestamp(entry.timestamp)}",
+            f"Workflow:  {entry.workflow}",
+            f"Branch:    {entry.branch}",
+            f"PostBuild: {entry.post_build_url}",
+            f"APK:       {entry.apk_download_url}",
+            f"Tags:      {entry.tags}",
+        ]
         if entry.memo:
             separator = "\n           "
-            lines = entry.memo.split("\n")
-            print(f"Memo:      {separator.join(lines)}")
+            memo_lines = entry.memo.split("\n")
+            lines.append(f"Memo:      {separator.join(memo_lines)}")
+        click.echo("\n".join(lines))
+
+
+_MAX_CONCURRENT_LOOKUPS = 8
+_MAX_CONCURRENT_DOWNLOADS = 4
 
 
 @builds.command()
@@ -364,6 +514,8 @@ def build_details(ctx: click.Context, build_nums: Sequence[int]) -> None:
 @click.pass_context
 def builds_apk(ctx: click.Context, build_nums: Sequence[int], output: str) -> None:
     """Download apk for the give app / branch."""
+    from .bitrise.utils import download_file
+
     context: NBPCommandContext = ctx.obj
     app_entry = context.app_entry
     bitrise_index_client = context.bitrise_index_client
@@ -371,39 +523,92 @@ def builds_apk(ctx: click.Context, build_nums: Sequence[int], output: str) -> No
     if len(build_nums) == 0:
         build_num_set = set()
         # Figure out what the latest builds are.
+        context.initialize_build_filters()
         git_branch = context.branch
         workflows = context.workflows
-        for workflow in workflows:
-            for entry in bitrise_index_client.list_latest_builds(
-                app_entry.app_code, branch=git_branch, workflow=workflow, limit=1
-            ):
+        for entries in _list_latest_builds(
+            bitrise_index_client, app_entry.app_code, git_branch, workflows, 1
+        ):
+            for entry in entries:
                 if entry.build_num not in build_num_set:
                     build_entries.append(entry)
                     build_num_set.add(entry.build_num)
 
     else:
+        # Deduplicate while keeping the order given on the command line. The index
+        # does not return builds in request order, so restore it here.
+        unique_build_nums = list(dict.fromkeys(build_nums))
+        build_by_num = {
+            entry.build_num: entry
+            for entry in bitrise_index_client.fetch_builds(
+                app_entry.app_code, unique_build_nums
+            )
+        }
         build_entries.extend(
-            bitrise_index_client.fetch_builds(app_entry.app_code, list(set(build_nums)))
+            build_by_num[build_num]
+            for build_num in unique_build_nums
+            if build_num in build_by_num
         )
 
-    for build_entry in build_entries:
-        # We are going to download one artifact at a time.
-        artifact_entry = bitrise_index_client.fetch_apk(
-            app_entry.app_code, build_num=build_entry.build_num
+    # Resolve all apk artifacts up front. The lookups are independent, so their
+    # round trips are overlapped instead of paid one build at a time.
+    artifact_entries = []
+    if build_entries:
+        with ThreadPoolExecutor(
+            max_workers=min(len(build_entries), _MAX_CONCURRENT_LOOKUPS)
+        ) as executor:
+            artifact_entries = list(
+                executor.map(
+                    lambda build_entry: bitrise_index_client.fetch_apk(
+                        app_entry.app_code, build_num=build_entry.build_num
+                    ),
+                    build_entries,
+                )
+            )
+
+    # Artifact names such as app-release.apk repeat across builds. Concurrent
+    # downloads must never share a file, so such names get the build number.
+    name_counts = Counter(artifact_entry.name for artifact_entry in artifact_entries)
+    output_files = [
+        os.path.join(
+            output,
+            (
+                f"{build_entry.build_num}-{artifact_entry.name}"
+                if name_counts[artifact_entry.name] > 1
+                else artifact_entry.name
+            ),
         )
-        output_file = os.path.join(output, artifact_entry.name)
+        for build_entry, artifact_entry in zip(build_entries, artifact_entries)
+    ]
+    for artifact_entry, output_file in zip(artifact_entries, output_files):
         click.echo(f"Downloading to {output_file}")
         click.echo(f"Download URL: {artifact_entry.download_url}")
-        with requests.get(artifact_entry.download_url, stream=True) as response:
-            response.raise_for_status()
-            with open(output_file, "wb") as file:
-                with tqdm(
-                    total=artifact_entry.byte_size, unit="b", unit_scale=True
-                ) as pbar:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            file.write(chunk)
-                            pbar.update(len(chunk))
+
+    # Download the artifacts in parallel. Each download draws its progress bar on
+    # the row of the worker slot it holds, so rows are reused as downloads finish.
+    slots: "queue.SimpleQueue[int]" = queue.SimpleQueue()
+    for slot in range(_MAX_CONCURRENT_DOWNLOADS):
+        slots.put(slot)
+
+    def download(artifact_entry, output_file: str) -> None:
+        slot = slots.get()
+        try:
+            download_file(
+                artifact_entry.download_url,
+                output_file,
+                artifact_entry.byte_size,
+                position=slot,
+            )
+        finally:
+            slots.put(slot)
+
+    with ThreadPoolExecutor(max_workers=_MAX_CONCURRENT_DOWNLOADS) as executor:
+        futures = [
+            executor.submit(download, artifact_entry, output_file)
+            for artifact_entry, output_file in zip(artifact_entries, output_files)
+        ]
+        for future in futures:
+            future.result()
 
 
 @builds.command("tag")